@@ -0,0 +1,124 @@
+import streamlit as st
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import unicodedata
+import tempfile
+import glob
+import os
+
+# ===============================
+# 유틸
+# ===============================
+def normalize_name(name):
+    return unicodedata.normalize("NFC", name)
+
+
+def downcast_numeric(df):
+    df = df.astype(dict.fromkeys(df.select_dtypes("float64").columns, "float32"))
+    for col in df.select_dtypes("int64").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+    return df
+
+
+# ===============================
+# 데이터 로딩
+# ===============================
+ENV_DTYPES = {
+    "temperature": "float32",
+    "humidity": "float32",
+    "ph": "float32",
+    "ec": "float32",
+}
+
+
+# 파싱 결과(열 선택, dtype 등)가 바뀌면 올려서 예전 사본을 무시한다
+CACHE_VERSION = 2
+
+
+# 원본 파일 옆에 Parquet 사본을 두고, 원본의 크기·수정 시각이 그대로면 그것을 읽는다
+def read_cached(src: Path, parse):
+    stat = src.stat()
+    cache = src.with_name(
+        f"_cache_{src.name}.v{CACHE_VERSION}.{stat.st_size}-{stat.st_mtime_ns}.parquet"
+    )
+    if cache.exists():
+        try:
+            return pd.read_parquet(cache)
+        except Exception:
+            pass  # 손상된 사본은 원본에서 다시 만든다
+
+    df = parse(src)
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=src.parent, prefix=cache.name, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, cache)
+    except Exception:
+        if tmp is not None:
+            Path(tmp).unlink(missing_ok=True)
+        return df
+
+    # 다른 버전·다른 원본으로 만든 예전 사본은 지운다
+    for stale in src.parent.glob(f"_cache_{glob.escape(src.name)}.v*.parquet"):
+        if stale != cache:
+            stale.unlink(missing_ok=True)
+    return df
+
+
+def parse_env_csv(f: Path):
+    return pd.read_csv(
+        f,
+        engine="pyarrow",
+        usecols=["time", *ENV_DTYPES],
+        dtype=ENV_DTYPES,
+        parse_dates=["time"],
+    )
+
+
+def read_env_csv(f: Path):
+    school = normalize_name(f.stem.split("_")[0])
+    return school, read_cached(f, parse_env_csv)
+
+
+def parse_growth_xlsx(xlsx_file: Path):
+    try:
+        sheets = pd.read_excel(xlsx_file, sheet_name=None, engine="calamine")
+    except (ImportError, ValueError):
+        sheets = pd.read_excel(xlsx_file, sheet_name=None, engine="openpyxl")
+    growth_long = pd.concat(
+        [df.assign(학교=normalize_name(sheet)) for sheet, df in sheets.items()],
+        ignore_index=True,
+    )
+    growth_long["학교"] = growth_long["학교"].astype("category")
+    return downcast_numeric(growth_long)
+
+
+@st.cache_data
+def load_environment_data(data_dir: Path):
+    paths = sorted(data_dir.glob("*.csv"))
+    if not paths:
+        return {}, pd.DataFrame(columns=list(ENV_DTYPES))
+
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+        env_data = dict(pool.map(read_env_csv, paths))
+
+    # 학교별 환경 평균 (행: 학교, 열: temperature/humidity/ph/ec)
+    env_avg = pd.DataFrame({
+        school: df[list(ENV_DTYPES)].mean() for school, df in env_data.items()
+    }).T
+    return env_data, env_avg
+
+
+@st.cache_data
+def load_growth_data(data_dir: Path):
+    xlsx_file = next(data_dir.glob("*.xlsx"), None)
+    if xlsx_file is None:
+        return {}
+
+    growth_long = read_cached(xlsx_file, parse_growth_xlsx)
+    return {
+        school: df.drop(columns="학교").reset_index(drop=True)
+        for school, df in growth_long.groupby("학교", sort=False, observed=True)
+    }
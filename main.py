@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from pathlib import Path
-import unicodedata
 import io
 
+from loaders import load_environment_data, load_growth_data
+
 # ===============================
 # 기본 설정
 # ===============================
@@ -30,43 +32,57 @@ html, body, [class*="css"] {
 # ===============================
 # 유틸
 # ===============================
-def normalize_name(name):
-    return unicodedata.normalize("NFC", name)
+# LTTB(Largest-Triangle-Three-Buckets): 시계열의 모양을 유지하며 n_out개 점만 남긴다
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n_out < 3 or n <= n_out:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    idx = np.empty(n_out, dtype=np.int64)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        idx[i + 1] = a
+    return idx
+
+
+TS_MAX_POINTS = 2000
 
 # ===============================
-# 데이터 로딩
+# 집계
 # ===============================
+# 프레임은 로더가 data_dir 기준으로 캐시하므로 해시하지 않고 경로로만 키를 잡는다
 @st.cache_data
-def load_environment_data(data_dir: Path):
-    env_data = {}
-    for f in data_dir.iterdir():
-        if f.suffix.lower() == ".csv":
-            school = normalize_name(f.stem.split("_")[0])
-            df = pd.read_csv(f)
-            df["time"] = pd.to_datetime(df["time"])
-            env_data[school] = df
-    return env_data
+def merge_growth(data_dir: Path, schools: list, _growth_data: dict, _env_avg: pd.DataFrame):
+    frames = [_growth_data[s] for s in schools]
+    growth_all = pd.concat(frames, ignore_index=True)
+    codes = np.repeat(np.arange(len(schools)), [len(df) for df in frames])
+    growth_all["학교"] = pd.Categorical.from_codes(codes, categories=schools)
+    growth_all["EC"] = _env_avg.loc[schools, "ec"].to_numpy()[codes]
+    ec_curve = growth_all.groupby("EC", sort=True)["생중량(g)"].mean().reset_index()
+    return growth_all, ec_curve
 
 
 @st.cache_data
-def load_growth_data(data_dir: Path):
-    xlsx_file = None
-    for f in data_dir.iterdir():
-        if f.suffix.lower() == ".xlsx":
-            xlsx_file = f
-            break
-
-    if xlsx_file is None:
-        return {}
-
-    growth = {}
-    xls = pd.ExcelFile(xlsx_file)
-    for sheet in xls.sheet_names:
-        school = normalize_name(sheet)
-        df = pd.read_excel(xlsx_file, sheet_name=sheet)
-        df["학교"] = school
-        growth[school] = df
-    return growth
+def downsample_env(data_dir: Path, school: str, _df: pd.DataFrame):
+    t = _df["time"].to_numpy().astype(np.int64)
+    return {
+        col: _df.iloc[lttb_indices(t, _df[col].to_numpy(), TS_MAX_POINTS)][["time", col]]
+        for col in ["temperature", "humidity", "ec"]
+    }
 
 
 # ===============================
@@ -79,7 +95,7 @@ with st.spinner("📂 데이터 로딩 중..."):
         st.error("❌ data 폴더를 찾을 수 없습니다.")
         st.stop()
 
-    env_data = load_environment_data(DATA_DIR)
+    env_data, env_avg = load_environment_data(DATA_DIR)
     growth_data = load_growth_data(DATA_DIR)
 
     if not env_data or not growth_data:
@@ -105,12 +121,16 @@ selected_school = st.sidebar.selectbox("🏫 학교 선택", schools)
 # 제목 & 탭
 # ===============================
 st.title("🌱 극지식물 최적 EC 농도 연구")
-tab1, tab2, tab3 = st.tabs(["📖 실험 개요", "🌡️ 환경 데이터", "📊 생육 결과"])
+tab1, tab2, tab3 = st.tabs(
+    ["📖 실험 개요", "🌡️ 환경 데이터", "📊 생육 결과"],
+    key="active_tab", on_change="rerun"
+)
 
 # ===============================
 # Tab 1: 실험 개요
 # ===============================
-with tab1:
+@st.fragment
+def render_overview():
     st.subheader("🔍 연구 배경 및 목적")
     st.markdown("""
     본 연구는 **극지 환경을 모사한 조건**에서  
@@ -118,80 +138,98 @@ with tab1:
     **최적 EC 농도 조건**을 도출하는 것을 목표로 한다.
     """)
 
-    summary = []
-    total_plants = 0
+    summary = pd.DataFrame({
+        "학교명": common_schools,
+        "평균 EC": env_avg.loc[common_schools, "ec"].round(2).to_numpy(),
+        "개체수": [len(growth_data[s]) for s in common_schools]
+    })
 
-    for school in common_schools:
-        df = growth_data[school]
-        total_plants += len(df)
+    st.dataframe(summary, width="stretch")
 
-        summary.append({
-            "학교명": school,
-            "평균 EC": round(env_data[school]["ec"].mean(), 2),
-            "개체수": len(df)
-        })
-
-    st.dataframe(pd.DataFrame(summary), use_container_width=True)
+with tab1:
+    if tab1.open:
+        render_overview()
 
 # ===============================
 # Tab 2: 환경 데이터
 # ===============================
-with tab2:
+@st.fragment
+def render_environment(selected_school):
     st.subheader("📊 학교별 환경 평균 비교")
 
-    avg_env = []
-    for s in common_schools:
-        df = env_data[s]
-        avg_env.append({
-            "학교": s,
-            "온도": df["temperature"].mean(),
-            "습도": df["humidity"].mean(),
-            "pH": df["ph"].mean(),
-            "EC": df["ec"].mean()
-        })
-
-    avg_df = pd.DataFrame(avg_env)
-
-    fig = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=("평균 온도", "평균 습도", "평균 pH", "평균 EC")
+    avg_df = (
+        env_avg
+        .loc[common_schools]
+        .rename(columns={"temperature": "온도", "humidity": "습도", "ph": "pH", "ec": "EC"})
+        .rename_axis("학교")
+        .reset_index()
     )
 
-    fig.add_bar(x=avg_df["학교"], y=avg_df["온도"], row=1, col=1)
-    fig.add_bar(x=avg_df["학교"], y=avg_df["습도"], row=1, col=2)
-    fig.add_bar(x=avg_df["학교"], y=avg_df["pH"], row=2, col=1)
-    fig.add_bar(x=avg_df["학교"], y=avg_df["EC"], row=2, col=2)
+    long_df = avg_df.melt(id_vars="학교", var_name="지표", value_name="평균")
+    fig = px.bar(
+        long_df, x="학교", y="평균",
+        facet_col="지표", facet_col_wrap=2, facet_row_spacing=0.12
+    )
+    fig.update_yaxes(matches=None, showticklabels=True)
+    fig.update_xaxes(showticklabels=True)
+    fig.for_each_annotation(lambda a: a.update(text="평균 " + a.text.split("=")[-1]))
 
     fig.update_layout(height=600)
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(fig, width="stretch", key="env_bars")
 
     if selected_school != "전체":
-        df = env_data[selected_school]
+        series = downsample_env(DATA_DIR, selected_school, env_data[selected_school])
         fig_ts = make_subplots(rows=3, cols=1, shared_xaxes=True)
-        fig_ts.add_line(x=df["time"], y=df["temperature"], row=1, col=1)
-        fig_ts.add_line(x=df["time"], y=df["humidity"], row=2, col=1)
-        fig_ts.add_line(x=df["time"], y=df["ec"], row=3, col=1)
+        for row, (col, df) in enumerate(series.items(), start=1):
+            fig_ts.add_trace(
+                go.Scattergl(x=df["time"], y=df[col], mode="lines"),
+                row=row, col=1
+            )
         fig_ts.update_layout(height=700)
-        st.plotly_chart(fig_ts, use_container_width=True)
+        st.plotly_chart(fig_ts, width="stretch", key="env_timeseries")
+
+with tab2:
+    if tab2.open:
+        render_environment(selected_school)
 
 # ===============================
 # Tab 3: 생육 결과
 # ===============================
-with tab3:
-    growth_all = pd.concat(growth_data[s] for s in common_schools)
-    ec_map = {s: env_data[s]["ec"].mean() for s in common_schools}
-    growth_all["EC"] = growth_all["학교"].map(ec_map)
+@st.fragment
+def render_growth():
+    growth_all, ec_avg = merge_growth(DATA_DIR, common_schools, growth_data, env_avg)
 
     st.subheader("🥇 EC별 평균 생중량")
-    ec_avg = growth_all.groupby("EC")["생중량(g)"].mean().reset_index()
-    st.plotly_chart(px.bar(ec_avg, x="EC", y="생중량(g)", text_auto=".2f"), use_container_width=True)
+    st.plotly_chart(
+        px.bar(ec_avg, x="EC", y="생중량(g)", text_auto=".2f"),
+        width="stretch", key="ec_bar"
+    )
 
     st.subheader("📦 학교별 생중량 분포")
-    st.plotly_chart(px.box(growth_all, x="학교", y="생중량(g)"), use_container_width=True)
+    st.plotly_chart(
+        px.box(growth_all[["학교", "생중량(g)"]], x="학교", y="생중량(g)", points=False),
+        width="stretch", key="growth_box"
+    )
+
+    render_simulator()
+
+# ===============================
+# 🌱 미니 스마트팜 시뮬레이터 (최종 수정)
+# ===============================
+IDEAL_H = 60.0
+IDEAL_EC = 2.0
+IDEAL_PH = 6.0
+
+# 기준 상태에서 50점이 되도록 상수항을 미리 계산해 둔다
+SIM_BIAS = 50 - IDEAL_H * 0.5 - IDEAL_EC * 15 - IDEAL_PH * 12
 
-    # ===============================
-    # 🌱 미니 스마트팜 시뮬레이터 (최종 수정)
-    # ===============================
+
+def simulate_growth_index(h, ec, ph):
+    return np.clip(SIM_BIAS + h * 0.5 + ec * 15 + ph * 12, 0, 100)
+
+
+@st.fragment
+def render_simulator():
     st.divider()
     st.subheader("🧪 미니 스마트팜 시뮬레이터")
 
@@ -205,17 +243,6 @@ with tab3:
     최적 조건에서는 **100점에 도달**할 수 있다.
     """)
 
-    IDEAL_H = 60.0
-    IDEAL_EC = 2.0
-    IDEAL_PH = 6.0
-
-    def simulate_growth_index(h, ec, ph):
-        score = 50
-        score += (h - IDEAL_H) * 0.5
-        score += (ec - IDEAL_EC) * 15
-        score += (ph - IDEAL_PH) * 12
-        return max(0, min(100, score))
-
     col1, col2 = st.columns([2, 1])
 
     with col1:
@@ -243,4 +270,8 @@ with tab3:
             yaxis=dict(visible=False),
             title="생육 상태 시각화"
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, width="stretch", key="sim_status")
+
+with tab3:
+    if tab3.open:
+        render_growth()